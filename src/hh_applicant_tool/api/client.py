@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import dataclasses
+import json
 import logging
 import time
 from dataclasses import dataclass
@@ -12,6 +14,11 @@ from urllib.parse import urlencode, urljoin
 import requests
 from requests import Session
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from hh_applicant_tool.api.user_agent import generate_android_useragent
 
 from . import errors
@@ -30,6 +37,9 @@ DEFAULT_DELAY = 0.345
 AllowedMethods = Literal["GET", "POST", "PUT", "DELETE"]
 T = TypeVar("T")
 
+# orjson разбирает ответы в несколько раз быстрее, но он необязателен
+json_loads = orjson.loads if orjson else json.loads
+
 
 logger = logging.getLogger(__package__)
 
@@ -109,9 +119,10 @@ class BaseClient:
                 # 'Server': 'ddos-guard'
                 # ...
                 # 'Transfer-Encoding': 'chunked'
+                # Разбираем байты напрямую, не декодируя тело в строку
                 try:
-                    rv = response.json() if response.text else {}
-                except as_json.decoder.JSONDecodeError as ex:
+                    rv = json_loads(response.content) if response.content else {}
+                except ValueError as ex:
                     raise errors.BadResponse(
                         f"Can't decode JSON: {method} {url} ({response.status_code})"
                     ) from ex
@@ -142,6 +153,17 @@ class BaseClient:
     def delete(self, *args, **kwargs) -> T:
         return self.request("DELETE", *args, **kwargs)
 
+    # Асинхронные обертки: блокирующий запрос уходит в отдельный поток, а
+    # задержки между запросами по-прежнему соблюдаются под self.lock
+    async def arequest(self, *args, **kwargs) -> T:
+        return await asyncio.to_thread(self.request, *args, **kwargs)
+
+    async def aget(self, *args, **kwargs) -> T:
+        return await self.arequest("GET", *args, **kwargs)
+
+    async def apost(self, *args, **kwargs) -> T:
+        return await self.arequest("POST", *args, **kwargs)
+
     def resolve_url(self, url: str) -> str:
         return urljoin(self.base_url, url.lstrip("/"))
 
@@ -213,6 +235,10 @@ class ApiClient(BaseClient):
     client_secret: str | None = None
     base_url: str = HH_API_URL
 
+    def __post_init__(self) -> None:
+        super().__post_init__()
+        self.refresh_lock = Lock()
+
     @property
     def is_access_expired(self) -> bool:
         return time.time() >= (self.access_expires_at or 0)
@@ -251,15 +277,20 @@ class ApiClient(BaseClient):
                 self, method, endpoint, params, delay, as_json, **kwargs
             )
 
+        access_token = self.access_token
         try:
             return do_request()
         # TODO: добавить класс для ошибок типа AccessTokenExpired
         except errors.Forbidden as ex:
-            if not self.is_access_expired or not self.refresh_token:
-                raise ex
-            logger.info("try to refresh access_token")
-            # Пробуем обновить токен
-            self.refresh_access_token()
+            # refresh_token одноразовый: если запросы идут из нескольких
+            # потоков, токен обновляет только первый из них
+            with self.refresh_lock:
+                if self.access_token == access_token:
+                    if not self.is_access_expired or not self.refresh_token:
+                        raise ex
+                    logger.info("try to refresh access_token")
+                    # Пробуем обновить токен
+                    self.refresh_access_token()
             # И повторно отправляем запрос
             return do_request()
 
@@ -1,12 +1,14 @@
 import enum
+import io
 import logging
+import mmap
 import re
 from collections import deque
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import auto
 from logging.handlers import RotatingFileHandler
 from os import PathLike
-from typing import Callable, TextIO
+from typing import Callable, Sequence, TextIO
 
 # 10MB
 MAX_LOG_SIZE = 10 << 20
@@ -35,40 +37,68 @@ class ColorHandler(logging.StreamHandler):
         "DEBUG": Color.BLUE,
     }
 
+    # Готовые escape-последовательности, чтобы не собирать их для каждой записи
+    _prefix_map = {
+        level: f"\033[{color.value}m" for level, color in _color_map.items()
+    }
+    _default_prefix = f"\033[{Color.WHITE.value}m"
+    _suffix = "\033[0m"
+
     def format(self, record: logging.LogRecord) -> str:
-        # Подавляем вывод подробного сообщения об ошибке
-        orig_exc_info = record.exc_info
+        # Детали ошибки показываем только при отладке. Запись общая для всех
+        # обработчиков, поэтому подавляем их в копии, не трогая оригинал
+        if self.level > logging.DEBUG and (record.exc_info or record.exc_text):
+            record = logging.makeLogRecord(record.__dict__)
+            record.exc_info = record.exc_text = None
+
+        prefix = self._prefix_map.get(record.levelname, self._default_prefix)
+        return prefix + super().format(record) + self._suffix
 
-        # Детали ошибки показываем только при отладке
-        if self.level > logging.DEBUG:
-            record.exc_info = None
 
-        message = super().format(record)
+def _compile_redact_patterns(patterns: Sequence[str]) -> re.Pattern:
+    # Группа не нужна: заменяется все совпадение целиком. Секреты —
+    # только ASCII, так что \b и классы символов без учета Unicode
+    return re.compile(f"(?:{'|'.join(patterns)})", re.ASCII)
 
-        # Восстанавливаем оригинальный exc_info
-        record.exc_info = orig_exc_info
 
-        color_code = self._color_map.get(record.levelname, Color.WHITE)
-        return f"\033[{color_code}m{message}\033[0m"
+DEFAULT_REDACT_PATTERNS = (
+    r"\b[A-Z0-9]{64,}\b",
+    r"\b[a-fA-F0-9]{32,}\b",  # request_id, resume_id
+)
+
+# Компилируется один раз и разделяется всеми фильтрами по умолчанию
+_DEFAULT_REDACT_RE = _compile_redact_patterns(DEFAULT_REDACT_PATTERNS)
 
 
 class RedactingFilter(logging.Filter):
     def __init__(
             self,
-            patterns: list[str],
+            patterns: Sequence[str] | re.Pattern = DEFAULT_REDACT_PATTERNS,
             placeholder: str | Callable = lambda m: "*" * len(m.group(0)),
     ):
         super().__init__()
-        self.pattern = (
-            re.compile(f"({'|'.join(patterns)})") if patterns else None
-        )
+        if isinstance(patterns, re.Pattern):
+            self.pattern = patterns
+        elif patterns is DEFAULT_REDACT_PATTERNS:
+            self.pattern = _DEFAULT_REDACT_RE
+        else:
+            self.pattern = (
+                _compile_redact_patterns(patterns) if patterns else None
+            )
         self.placeholder = placeholder
 
     def filter(self, record: logging.LogRecord) -> bool:
-        if self.pattern:
+        # Одна и та же запись может пройти через фильтр на нескольких
+        # обработчиках — повторно ее не форматируем и не чистим
+        if self.pattern and (
+            getattr(record, "_redacted_by", None) is not self.pattern
+        ):
             msg = record.getMessage()
             msg = self.pattern.sub(self.placeholder, msg)
+            # Без args getMessage больше не применяет % к сообщению
             record.msg, record.args = msg, ()
+            record.message = msg
+            record._redacted_by = self.pattern
         return True
 
 
@@ -102,12 +132,7 @@ def setup_logger(
     file_handler.setLevel(logging.DEBUG)
 
     # ===== Redaction filter =====
-    redactor = RedactingFilter(
-        [
-            r"\b[A-Z0-9]{64,}\b",
-            r"\b[a-fA-F0-9]{32,}\b",  # request_id, resume_id
-        ]
-    )
+    redactor = RedactingFilter()
     file_handler.addFilter(redactor)
 
     # ===== Attach handlers =====
@@ -115,7 +140,66 @@ def setup_logger(
     logger.addHandler(file_handler)
 
 
-TS_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+TS_RE = re.compile(rb"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}", re.MULTILINE)
+TRACEBACK_HEADER = b"Traceback (most recent call last):"
+
+
+def _find_line(buf: bytes | mmap.mmap, prefix: bytes, pos: int) -> int:
+    while (i := buf.find(prefix, pos)) != -1:
+        if i == 0 or buf[i - 1] == ord("\n"):
+            return i
+        pos = i + 1
+    return -1
+
+
+def _find_tail_start(buf: bytes | mmap.mmap, after_key: bytes) -> int:
+    # Идем по строкам с конца до первой записи старше after_key. Ее тоже
+    # оставляем: от нее отсчитывается время следующих строк
+    pos = len(buf)
+    while True:
+        start = buf.rfind(b"\n", 0, pos) + 1
+        if (m := TS_RE.match(buf, start)) and m.group(0) < after_key:
+            return start
+        if start == 0:
+            return 0
+        pos = start - 1
+
+
+def _find_timestamp(
+    buf: bytes | mmap.mmap, pos: int, stop: int
+) -> bytes | None:
+    # Время строки — время последней записи перед ней
+    while pos >= stop:
+        if m := TS_RE.match(buf, pos):
+            return m.group(0)
+        if pos == 0:
+            break
+        pos = buf.rfind(b"\n", 0, pos - 1) + 1
+    return None
+
+
+def _collect_tracebacks(
+    buf: bytes | mmap.mmap,
+    after_key: bytes,
+    maxlines: int,
+) -> bytes:
+    error_lines = deque(maxlen=maxlines)
+    tail_start = pos = _find_tail_start(buf, after_key)
+
+    while (tb_start := _find_line(buf, TRACEBACK_HEADER, pos)) != -1:
+        # Трейсбек продолжается до следующей записи с временем
+        m = TS_RE.search(buf, tb_start)
+        pos = m.start() if m else len(buf)
+
+        log_ts = _find_timestamp(buf, tb_start, tail_start)
+        if not log_ts or log_ts < after_key:
+            continue
+
+        # Вместе с трейсбеком сохраняем предшествующую ему строку
+        prev_start = buf.rfind(b"\n", 0, tb_start - 1) + 1 if tb_start else 0
+        error_lines.extend(buf[prev_start:pos].splitlines(keepends=True))
+
+    return b"".join(error_lines)
 
 
 def collect_traceback_logs(
@@ -123,29 +207,26 @@ def collect_traceback_logs(
         after_dt: datetime,
         maxlines: int = 1000,
 ) -> str:
-    error_lines = deque(maxlen=maxlines)
-    prev_line = ""
-    log_dt = None
-    collecting_traceback = False
-
-    for line in fp:
-        if ts_match := TS_RE.match(line):
-            log_dt = datetime.strptime(
-                ts_match.group(0), "%Y-%m-%d %H:%M:%S"
-            )
-            collecting_traceback = False
-
-        if (
-                line.startswith("Traceback (most recent call last):")
-                and log_dt
-                and log_dt >= after_dt
-        ):
-            error_lines.append(prev_line)
-            collecting_traceback = True
-
-        if collecting_traceback:
-            error_lines.append(line)
-
-        prev_line = line
+    # Время в логе с точностью до секунды, поэтому after_dt округляем вверх
+    if after_dt.microsecond:
+        after_dt = after_dt.replace(microsecond=0) + timedelta(seconds=1)
+    # Строки YYYY-MM-DD HH:MM:SS можно сравнивать без разбора в datetime
+    after_key = after_dt.strftime("%Y-%m-%d %H:%M:%S").encode()
+
+    encoding = getattr(fp, "encoding", None) or "utf-8"
+    errors = getattr(fp, "errors", None) or "strict"
+
+    # Файл отображаем в память и ищем трейсбеки в байтах, декодируя
+    # только найденное
+    try:
+        mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, io.UnsupportedOperation):
+        # Пустой файл или поток не из файла, например, io.StringIO
+        result = _collect_tracebacks(
+            fp.read().encode(encoding, errors), after_key, maxlines
+        )
+    else:
+        with mm:
+            result = _collect_tracebacks(mm, after_key, maxlines)
 
-    return "".join(error_lines)
+    return result.replace(b"\r\n", b"\n").decode(encoding, errors)
@@ -0,0 +1,140 @@
+import argparse
+from types import SimpleNamespace
+
+import pytest
+
+from hh_applicant_tool.api.errors import Forbidden, LimitExceeded
+from hh_applicant_tool.operations.apply_similar import Operation
+
+
+def _vacancy(vacancy_id: str, employer_id: str) -> dict:
+    return {
+        "id": vacancy_id,
+        "name": f"Python developer {vacancy_id}",
+        "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "employer": {"id": employer_id, "name": f"Employer {employer_id}"},
+        "relations": [],
+        "snippet": {},
+    }
+
+
+class FakeApiClient:
+    def __init__(self, pages: list[list[dict]], fail: dict | None = None):
+        self.pages = pages
+        # На каком по счету вызове падает запрос: {"GET": (n, exc), ...}
+        self.fail = fail or {}
+        self.calls = {"GET": 0, "POST": 0}
+        self.fetched_pages: list[int] = []
+        self.applied: list[str] = []
+        self.requests: list[str] = []
+
+    async def aget(self, url: str, params: dict) -> dict:
+        self._maybe_fail("GET")
+        page = params["page"]
+        self.fetched_pages.append(page)
+        self.requests.append(f"GET {page}")
+        return {"items": self.pages[page], "pages": len(self.pages)}
+
+    async def apost(self, url: str, params: dict, delay: float) -> dict:
+        self._maybe_fail("POST")
+        self.applied.append(params["vacancy_id"])
+        self.requests.append(f"POST {params['vacancy_id']}")
+        return {}
+
+    def _maybe_fail(self, method: str) -> None:
+        n = self.calls[method]
+        self.calls[method] += 1
+        if method in self.fail and self.fail[method][0] == n:
+            raise self.fail[method][1]
+
+
+def _run(api_client: FakeApiClient, *argv: str) -> None:
+    parser = argparse.ArgumentParser()
+    operation = Operation()
+    operation.setup_parser(parser)
+    tool = SimpleNamespace(
+        api_client=api_client,
+        args=parser.parse_args(["--per-page", "3", *argv]),
+        get_resumes=lambda: [
+            {
+                "id": "r1",
+                "title": "Python developer",
+                "alternate_url": "https://hh.ru/resume/r1",
+                "status": {"id": "published"},
+            }
+        ],
+        get_me=lambda: {"first_name": "Иван"},
+    )
+    operation.run(tool)
+
+
+@pytest.mark.parametrize("concurrency", ["1", "4"])
+def test_applies_once_per_employer(concurrency):
+    api_client = FakeApiClient(
+        [
+            [_vacancy("1", "e1"), _vacancy("2", "e1"), _vacancy("3", "e2")],
+            [_vacancy("4", "e2"), _vacancy("5", "e3")],
+        ]
+    )
+    _run(api_client, "--concurrency", concurrency)
+    employers = {"1": "e1", "2": "e1", "3": "e2", "4": "e2", "5": "e3"}
+    assert sorted(employers[v] for v in api_client.applied) == [
+        "e1",
+        "e2",
+        "e3",
+    ]
+
+
+def test_failed_application_frees_employer():
+    api_client = FakeApiClient(
+        [[_vacancy("1", "e1"), _vacancy("2", "e1")]],
+        fail={"POST": (0, Forbidden(None, {"description": "forbidden"}))},
+    )
+    _run(api_client)
+    assert api_client.applied == ["2"]
+
+
+def test_stops_at_limit():
+    api_client = FakeApiClient(
+        [
+            [_vacancy("1", "e1"), _vacancy("2", "e2"), _vacancy("3", "e3")],
+            [_vacancy("4", "e4")],
+        ],
+        fail={"POST": (1, LimitExceeded(None, {"description": "limit"}))},
+    )
+    _run(api_client)
+    assert api_client.applied == ["1"]
+    assert api_client.fetched_pages == [0]
+
+
+def test_stops_at_last_page():
+    api_client = FakeApiClient(
+        [[_vacancy(f"{p}{i}", f"e{p}{i}") for i in range(3)] for p in range(4)]
+    )
+    _run(api_client, "--total-pages", "5")
+    assert api_client.fetched_pages == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("concurrency", ["1", "4"])
+def test_next_page_is_fetched_after_current_one(concurrency):
+    api_client = FakeApiClient(
+        [
+            [_vacancy("1", "e1"), _vacancy("2", "e2"), _vacancy("3", "e3")],
+            [_vacancy("4", "e4")],
+        ]
+    )
+    _run(api_client, "--concurrency", concurrency)
+    assert api_client.requests[0] == "GET 0"
+    assert api_client.requests[4] == "GET 1"
+    assert len(api_client.requests) == 6
+
+
+def test_page_fetch_error_is_not_wrapped():
+    api_client = FakeApiClient(
+        [[_vacancy("1", "e1")]],
+        fail={"GET": (0, Forbidden(None, {"description": "forbidden"}))},
+    )
+    # HHApplicantTool.run обрабатывает Forbidden, а не ExceptionGroup
+    with pytest.raises(Forbidden):
+        _run(api_client, "--concurrency", "2")
+    assert api_client.applied == []
@@ -0,0 +1,103 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from hh_applicant_tool.utils.log import collect_traceback_logs
+
+TRACEBACK = (
+    "Traceback (most recent call last):\n"
+    '  File "main.py", line 1, in <module>\n'
+    "ValueError: плохо\n"
+)
+
+
+def _collect(tmp_path, text: str, after_dt: datetime, **kwargs) -> str:
+    log_file = tmp_path / "log.txt"
+    log_file.write_bytes(text.encode())
+    with log_file.open(encoding="utf-8", errors="ignore") as fp:
+        return collect_traceback_logs(fp, after_dt, **kwargs)
+
+
+def test_collects_only_tracebacks_after_dt(tmp_path):
+    text = (
+        "2026-01-01 09:00:00,000 - ERROR - old\n"
+        + TRACEBACK
+        + "2026-01-01 10:00:00,000 - INFO - ok\n"
+        "2026-01-01 11:00:00,000 - ERROR - new\n"
+        + TRACEBACK
+        + "2026-01-01 11:00:01,000 - INFO - after\n"
+    )
+    assert (
+        _collect(tmp_path, text, datetime(2026, 1, 1, 10))
+        == "2026-01-01 11:00:00,000 - ERROR - new\n" + TRACEBACK
+    )
+
+
+@pytest.mark.parametrize(
+    "after_dt, expected",
+    [
+        (datetime(2026, 1, 1, 10, 0, 0), True),
+        # Время в логе с точностью до секунды
+        (datetime(2026, 1, 1, 10, 0, 0, 500000), False),
+        (datetime(2026, 1, 1, 10, 0, 1), False),
+    ],
+)
+def test_after_dt_rounding(tmp_path, after_dt, expected):
+    text = "2026-01-01 10:00:00,900 - ERROR - boom\n" + TRACEBACK
+    result = _collect(tmp_path, text, after_dt)
+    assert bool(result) is expected
+
+
+def test_crlf_log(tmp_path):
+    text = "2026-01-01 10:00:00,000 - ERROR - boom\n" + TRACEBACK
+    assert (
+        _collect(tmp_path, text.replace("\n", "\r\n"), datetime(2026, 1, 1))
+        == text
+    )
+
+
+def test_traceback_at_eof_without_newline(tmp_path):
+    text = "2026-01-01 10:00:00,000 - ERROR - boom\n" + TRACEBACK.rstrip("\n")
+    assert _collect(tmp_path, text, datetime(2026, 1, 1)) == text
+
+
+def test_traceback_at_bof_without_timestamp_is_ignored(tmp_path):
+    text = TRACEBACK + "2026-01-01 10:00:00,000 - INFO - ok\n"
+    assert _collect(tmp_path, text, datetime(2026, 1, 1)) == ""
+
+
+def test_maxlines_keeps_last_lines(tmp_path):
+    text = "2026-01-01 10:00:00,000 - ERROR - boom\n" + TRACEBACK
+    assert (
+        _collect(tmp_path, text, datetime(2026, 1, 1), maxlines=2)
+        == "".join(TRACEBACK.splitlines(keepends=True)[-2:])
+    )
+
+
+def test_empty_file(tmp_path):
+    assert _collect(tmp_path, "", datetime(2026, 1, 1)) == ""
+
+
+def test_stringio_fallback():
+    text = "2026-01-01 10:00:00,000 - ERROR - boom\n" + TRACEBACK
+    assert (
+        collect_traceback_logs(io.StringIO(text), datetime(2026, 1, 1))
+        == text
+    )
+
+
+def test_chained_traceback_is_collected_once(tmp_path):
+    text = (
+        "2026-01-01 10:00:00,000 - ERROR - boom\n"
+        + TRACEBACK
+        + "\nDuring handling of the above exception, another exception occurred:\n\n"
+        + TRACEBACK
+    )
+    # Вложенный трейсбек входит в уже собранный, пустая строка перед ним
+    # не дублируется
+    assert (
+        _collect(tmp_path, text + "2026-01-01 10:00:01,000 - INFO - ok\n",
+                 datetime(2026, 1, 1))
+        == text
+    )